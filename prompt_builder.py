@@ -3,12 +3,23 @@
 from __future__ import annotations
 
 import json
+import os
 import random
 import re
+import stat
+import sys
+from collections import Counter
 from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Iterable, Mapping, MutableMapping
+from typing import Any, Callable, Iterable, Iterator, Mapping, MutableMapping
+
+# ``orjson`` is an optional accelerator. Both parsers accept UTF-8 bytes and
+# ``orjson.JSONDecodeError`` subclasses ``json.JSONDecodeError``.
+try:
+    from orjson import loads as _json_loads
+except ImportError:  # pragma: no cover - depends on the environment
+    _json_loads = json.loads
 
 
 MADLIB_PREFIX = "madlib"
@@ -16,8 +27,13 @@ VARIABLE_PREFIX = "var"
 PLACEHOLDER_PATTERN = re.compile(r"\$\{([^}:]+):([^}]+)\}")
 DEFAULT_MADLIB_SUBDIR = "madlib"
 
-_TEXT_SETTING_KEYS = {"system_prompt", "reasoning_effort", "verbosity"}
-_IMAGE_SETTING_KEYS = {"aspect_ratio", "output_format", "image_input"}
+# Shared by renders that do not pass ``rng`` so each call avoids re-seeding
+# from OS entropy; concurrent callers may interleave draws, which is fine for
+# non-deterministic output.
+_DEFAULT_RNG = random.Random()
+
+_TEXT_SETTING_KEYS = frozenset({"system_prompt", "reasoning_effort", "verbosity"})
+_IMAGE_SETTING_KEYS = frozenset({"aspect_ratio", "output_format", "image_input"})
 
 
 class PromptTemplateError(RuntimeError):
@@ -58,42 +74,83 @@ def render_prompt(
         madlib_dir: Directory containing madlib JSON files. Defaults to the
             ``madlib`` subdirectory next to the template.
         rng: Optional ``random.Random`` instance for deterministic sampling.
+            Defaults to a module-level generator shared by all such calls.
 
     Returns:
-        A dictionary representing the fully rendered template payload.
+        A dictionary representing the fully rendered template payload. The
+        top-level dictionary is always new, but nested lists and dictionaries
+        that contain no placeholders are shared with the template cache and
+        must not be mutated.
 
     Raises:
         PromptTemplateError: If placeholders reference unknown data or files.
     """
 
-    template_path = Path(template_path)
-    if not template_path.exists():
-        raise PromptTemplateError(f"Template not found: {template_path}")
+    # Caches are keyed on the absolute path as given rather than the resolved
+    # one: ``resolve`` costs an ``lstat`` per path component on every render,
+    # while ``absolute`` only consults the working directory for relative paths.
+    template_path = Path(template_path).absolute()
+    mtime_ns = _stat_or_raise(template_path, "Template").st_mtime_ns
+    template_data = _load_template(template_path, mtime_ns)
+
+    customized = _merge_customizations(
+        template_data,
+        overrides=overrides,
+        text_settings=text_settings,
+        image_settings=image_settings,
+    )
+    if customized is None:
+        # The cached program never mutates the template, so no copy is needed
+        # unless there is nothing to substitute.
+        compiled = _compile_template_file(template_path, mtime_ns)
+        if compiled.static:
+            return dict(template_data)
+    else:
+        compiled = _compile_template(customized, generate=False)
+        if compiled.static:
+            return customized
+
+    context = _ResolutionContext(
+        madlib_dir=_determine_madlib_dir(template_path, madlib_dir),
+        variables=variables or {},
+        rng=rng or _DEFAULT_RNG,
+        selections=selection_log if selection_log is not None else {},
+        madlib_overrides=madlib_overrides or {},
+    )
+
+    return compiled.render(context)
+
 
-    template_data = _load_json(template_path)
+def _merge_customizations(
+    template_data: Mapping[str, Any],
+    *,
+    overrides: Mapping[str, Any] | None,
+    text_settings: Mapping[str, Any] | None,
+    image_settings: Mapping[str, Any] | None,
+) -> dict[str, Any] | None:
+    """Return a merged copy of the template, or ``None`` if nothing applies."""
+
+    if not (overrides or text_settings or image_settings):
+        return None
 
     resolved: dict[str, Any] = dict(template_data)
+    customized = False
 
     if overrides:
         resolved.update(overrides)
+        customized = True
 
     template_type = resolved.get("type")
     if template_type == "text" and text_settings:
         _validate_keys(text_settings, _TEXT_SETTING_KEYS, "text_settings")
         resolved.update(text_settings)
+        customized = True
     if template_type == "image" and image_settings:
         _validate_keys(image_settings, _IMAGE_SETTING_KEYS, "image_settings")
         resolved.update(image_settings)
+        customized = True
 
-    context = _ResolutionContext(
-        madlib_dir=_determine_madlib_dir(template_path, madlib_dir),
-        variables=variables or {},
-        rng=rng or random.Random(),
-        selections=selection_log if selection_log is not None else {},
-        madlib_overrides=madlib_overrides or {},
-    )
-
-    return _resolve_structure(resolved, context)
+    return resolved if customized else None
 
 
 def _determine_madlib_dir(
@@ -104,120 +161,447 @@ def _determine_madlib_dir(
     else:
         directory = template_path.parent / DEFAULT_MADLIB_SUBDIR
 
-    if not directory.exists():
-        raise PromptTemplateError(f"Madlib directory not found: {directory}")
-    if not directory.is_dir():
+    if not stat.S_ISDIR(_stat_or_raise(directory, "Madlib directory").st_mode):
         raise PromptTemplateError(
             f"Madlib path is not a directory: {directory}"
         )
-    return directory.resolve()
+    return directory.absolute()
 
 
-def _resolve_structure(value: Any, context: _ResolutionContext) -> Any:
-    if isinstance(value, str):
-        return _resolve_string(value, context)
-    if isinstance(value, list):
-        return [_resolve_structure(item, context) for item in value]
-    if isinstance(value, tuple):
-        return tuple(_resolve_structure(item, context) for item in value)
-    if isinstance(value, set):
-        return {_resolve_structure(item, context) for item in value}
-    if isinstance(value, dict):
-        return {
-            key: _resolve_structure(item, context)
-            for key, item in value.items()
-        }
-    return value
+class _CodeWriter:
+    """Accumulates the statements of a generated render function.
+
+    Only ``repr``'d ``str`` literals and generated names are ever written into
+    the source; every other value is passed in through the ``constants``
+    tuple, which also keeps static subtrees shared by identity.
+    """
+
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+        self.constants: list[Any] = []
+
+    def constant(self, value: Any) -> str:
+        if type(value) is str:
+            return repr(value)
+        self.constants.append(value)
+        return f"_k[{len(self.constants) - 1}]"
+
+    def temporary(self, expression: str) -> str:
+        # Containers are bound to locals in postorder so the generated code
+        # stays flat however deeply the template nests.
+        name = f"_t{len(self.lines)}"
+        self.lines.append(f"{name} = {expression}")
+        return name
+
+
+class _Node:
+    """A compiled template value.
+
+    ``emit`` writes a Python expression for the value into generated code;
+    ``evaluate`` computes it directly from the resolved placeholder values.
+    """
+
+    __slots__ = ()
+
+    def emit(self, writer: _CodeWriter) -> str:
+        raise NotImplementedError
+
+    def evaluate(self, values: list[str]) -> Any:
+        raise NotImplementedError
+
+
+class _Constant(_Node):
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def emit(self, writer: _CodeWriter) -> str:
+        return writer.constant(self.value)
+
+    def evaluate(self, values: list[str]) -> Any:
+        return self.value
+
+
+class _Text(_Node):
+    """A string split into literal segments around placeholder slots.
+
+    ``literals`` always holds one more entry than ``slots``; each slot is the
+    index of a placeholder in the template's op list.
+    """
+
+    __slots__ = ("literals", "slots")
+
+    def __init__(self, literals: tuple[str, ...], slots: tuple[int, ...]) -> None:
+        self.literals = literals
+        self.slots = slots
+
+    def emit(self, writer: _CodeWriter) -> str:
+        parts = [repr(self.literals[0])] if self.literals[0] else []
+        for slot, literal in zip(self.slots, self.literals[1:]):
+            parts.append(f"_v{slot}")
+            if literal:
+                parts.append(repr(literal))
+        return " + ".join(parts)
+
+    def evaluate(self, values: list[str]) -> str:
+        parts = [self.literals[0]]
+        for slot, literal in zip(self.slots, self.literals[1:]):
+            parts.append(values[slot])
+            parts.append(literal)
+        return "".join(parts)
+
+
+class _Dict(_Node):
+    __slots__ = ("items",)
+
+    def __init__(self, items: tuple[tuple[Any, _Node], ...]) -> None:
+        self.items = items
 
+    def emit(self, writer: _CodeWriter) -> str:
+        entries = [
+            f"{writer.constant(key)}: {node.emit(writer)}" for key, node in self.items
+        ]
+        return writer.temporary("{" + ", ".join(entries) + "}")
 
-def _resolve_string(source: str, context: _ResolutionContext) -> str:
-    def replacer(match: re.Match[str]) -> str:
-        prefix, key = match.group(1), match.group(2)
+    def evaluate(self, values: list[str]) -> dict[Any, Any]:
+        return {key: node.evaluate(values) for key, node in self.items}
+
+
+class _List(_Node):
+    __slots__ = ("items",)
+
+    def __init__(self, items: tuple[_Node, ...]) -> None:
+        self.items = items
+
+    def emit(self, writer: _CodeWriter) -> str:
+        items = [node.emit(writer) for node in self.items]
+        return writer.temporary("[" + ", ".join(items) + "]")
+
+    def evaluate(self, values: list[str]) -> list[Any]:
+        return [node.evaluate(values) for node in self.items]
+
+
+class _Collection(_Node):
+    """A tuple or set supplied through ``overrides``; JSON only yields lists.
+
+    Collections are never empty here: an empty one has no placeholders and
+    compiles to a ``_Constant`` instead.
+    """
+
+    __slots__ = ("items", "factory")
+
+    def __init__(self, items: tuple[_Node, ...], factory: type) -> None:
+        self.items = items
+        self.factory = factory
+
+    def emit(self, writer: _CodeWriter) -> str:
+        items = "".join(f"{node.emit(writer)}, " for node in self.items)
+        if self.factory is tuple:
+            return writer.temporary(f"({items})")
+        return writer.temporary(f"{{{items}}}")
+
+    def evaluate(self, values: list[str]) -> Any:
+        return self.factory(node.evaluate(values) for node in self.items)
+
+
+_RenderFunction = Callable[
+    [Mapping[str, Iterator[str]], Mapping[str, str]], dict[str, Any]
+]
+
+
+@dataclass(frozen=True)
+class _CompiledTemplate:
+    """A template specialised into a generated Python render function.
+
+    ``ops`` lists every ``(prefix, key)`` placeholder in traversal order and
+    ``madlib_draws`` counts how often each madlib key occurs, in order of first
+    appearance. ``build`` resolves the ops in order and returns the rendered
+    payload. Cached template files get straight-line generated code; one-shot
+    customized templates walk the node tree instead, since generating and
+    compiling code would cost more than the single render it serves.
+    """
+
+    build: _RenderFunction
+    ops: tuple[tuple[str, str], ...]
+    madlib_draws: tuple[tuple[str, int], ...]
+    variable_keys: frozenset[str]
+
+    @property
+    def static(self) -> bool:
+        return not self.ops
+
+    def render(self, context: _ResolutionContext) -> Any:
+        variables = _stringify_variables(context.variables, self.variable_keys)
+        madlib_overrides = context.madlib_overrides
+        selections = context.selections
+        rng = context.rng
+
+        # Each madlib file is loaded once per render however often its key is
+        # referenced; repeated keys take all their picks in one
+        # ``rng.choices`` call. Picks are drawn up front in traversal order, so
+        # each key's selection log is extended once rather than per placeholder.
+        draws: dict[str, Iterator[str]] = {}
+        for key, count in self.madlib_draws:
+            choices, size = _load_madlib_pool(context.madlib_dir, key)
+            picks: list[str] | tuple[str, ...]
+            if key in madlib_overrides:
+                picks = (madlib_overrides[key],) * count
+            elif count == 1:
+                picks = (choices[rng.randrange(size)],)
+            else:
+                picks = rng.choices(choices, k=count)
+            selections.setdefault(key, []).extend(picks)
+            draws[key] = iter(picks)
+
+        return self.build(draws, variables)
+
+
+@lru_cache(maxsize=128)
+def _compile_template_file(path: Path, mtime_ns: int) -> _CompiledTemplate:
+    return _compile_template(_load_template(path, mtime_ns), label=str(path))
+
+
+def _compile_template(
+    data: Mapping[str, Any], *, label: str = "overrides", generate: bool = True
+) -> _CompiledTemplate:
+    ops: list[tuple[str, str]] = []
+    # The top level is always rebuilt so callers get a dictionary of their own.
+    root = _Dict(tuple((key, _compile_node(item, ops)) for key, item in data.items()))
+    madlib_draws = Counter(key for prefix, key in ops if prefix == MADLIB_PREFIX)
+    return _CompiledTemplate(
+        build=(
+            _generate_render_function(root, ops, label)
+            if generate
+            else _interpret_render_function(root, ops)
+        ),
+        ops=tuple(ops),
+        madlib_draws=tuple(madlib_draws.items()),
+        variable_keys=frozenset(
+            key for prefix, key in ops if prefix == VARIABLE_PREFIX
+        ),
+    )
+
+
+def _generate_render_function(
+    root: _Node, ops: list[tuple[str, str]], label: str
+) -> _RenderFunction:
+    writer = _CodeWriter()
+    for index, (prefix, key) in enumerate(ops):
         if prefix == MADLIB_PREFIX:
-            return _select_madlib_value(context, key)
-        if prefix == VARIABLE_PREFIX:
-            return _lookup_variable(context.variables, key)
+            writer.lines.append(f"_v{index} = next(draws[{key!r}])")
+        else:
+            writer.lines.append(f"_v{index} = variables[{key!r}]")
+    result = root.emit(writer)
+
+    body = "".join(f"    {line}\n" for line in writer.lines)
+    source = (
+        "def _render(draws, variables, _k=_k):\n"
+        f"{body}    return {result}\n"
+    )
+    namespace: dict[str, Any] = {"_k": tuple(writer.constants)}
+    exec(compile(source, f"<template {label}>", "exec"), namespace)  # nosec - see _CodeWriter
+    return namespace["_render"]
+
+
+def _interpret_render_function(
+    root: _Node, ops: list[tuple[str, str]]
+) -> _RenderFunction:
+    def _render(
+        draws: Mapping[str, Iterator[str]], variables: Mapping[str, str]
+    ) -> dict[str, Any]:
+        values = [
+            next(draws[key]) if prefix == MADLIB_PREFIX else variables[key]
+            for prefix, key in ops
+        ]
+        return root.evaluate(values)
+
+    return _render
+
+
+def _compile_node(value: Any, ops: list[tuple[str, str]]) -> _Node:
+    # Exact type checks ordered by frequency cover everything ``json.loads``
+    # produces; containers without any placeholder compile to a constant
+    # holding the original object, so rendering returns it as-is.
+    kind = type(value)
+    if kind is str:
+        return _compile_string(value, ops)
+    if kind is dict:
+        entries = tuple((key, _compile_node(item, ops)) for key, item in value.items())
+        if _all_constant(node for _, node in entries):
+            return _Constant(value)
+        return _Dict(entries)
+    if kind is list:
+        items = tuple(_compile_node(item, ops) for item in value)
+        if _all_constant(items):
+            return _Constant(value)
+        return _List(items)
+    if kind in (int, float, bool) or value is None:
+        return _Constant(value)
+    return _compile_python_value(value, ops)
+
+
+def _compile_python_value(value: Any, ops: list[tuple[str, str]]) -> _Node:
+    """Slow path for non-JSON values that can arrive through ``overrides``."""
+
+    if isinstance(value, str):
+        return _compile_string(str(value), ops)
+    if isinstance(value, dict):
+        return _compile_node(dict(value), ops)
+    if isinstance(value, (list, tuple, set)):
+        items = tuple(_compile_node(item, ops) for item in value)
+        if _all_constant(items):
+            return _Constant(value)
+        if isinstance(value, list):
+            return _List(items)
+        return _Collection(items, tuple if isinstance(value, tuple) else set)
+    return _Constant(value)
+
+
+def _all_constant(nodes: Iterable[_Node]) -> bool:
+    return all(isinstance(node, _Constant) for node in nodes)
+
+
+def _compile_string(source: str, ops: list[tuple[str, str]]) -> _Node:
+    # Most strings hold zero or one placeholder; ``str.find`` and
+    # ``str.partition`` settle those without running the regex engine.
+    start = source.find("${")
+    if start < 0:
+        return _Constant(source)
+    if source.find("${", start + 2) < 0:
+        end = source.find("}", start + 2)
+        prefix, separator, key = source[start + 2 : end].partition(":")
+        if end < 0 or not (separator and prefix and key):
+            return _Constant(source)
+        slot = _add_op(prefix, key, source, ops)
+        return _Text((source[:start], source[end + 1 :]), (slot,))
+
+    literals: list[str] = []
+    slots: list[int] = []
+    last = 0
+    for match in PLACEHOLDER_PATTERN.finditer(source):
+        literals.append(source[last : match.start()])
+        slots.append(_add_op(match.group(1), match.group(2), source, ops))
+        last = match.end()
+
+    if not slots:
+        return _Constant(source)
+    literals.append(source[last:])
+    return _Text(tuple(literals), tuple(slots))
+
+
+def _add_op(prefix: str, key: str, source: str, ops: list[tuple[str, str]]) -> int:
+    if prefix not in (MADLIB_PREFIX, VARIABLE_PREFIX):
         raise PromptTemplateError(
             f"Unsupported placeholder prefix '{prefix}' in '{source}'"
         )
+    ops.append((prefix, key))
+    return len(ops) - 1
 
-    return PLACEHOLDER_PATTERN.sub(replacer, source)
 
+def _stringify_variables(
+    variables: Mapping[str, Any], keys: frozenset[str]
+) -> dict[str, str]:
+    """Validate and coerce every referenced variable once per render."""
 
-def _lookup_variable(variables: Mapping[str, Any], key: str) -> str:
-    if key not in variables:
+    missing = keys - variables.keys()
+    if missing:
+        placeholders = ", ".join(
+            f"'${{{VARIABLE_PREFIX}:{key}}}'" for key in sorted(missing)
+        )
         raise PromptTemplateError(
-            f"Missing runtime variable '{key}' for placeholder '${{{VARIABLE_PREFIX}:{key}}}'"
+            f"Missing runtime variable(s) {sorted(missing)} for placeholder(s) {placeholders}"
         )
-    value = variables[key]
-    if isinstance(value, (str, int, float)):
-        return str(value)
-    raise PromptTemplateError(
-        f"Variable '{key}' must resolve to a string-compatible value, got {type(value)!r}"
-    )
+
+    strings: dict[str, str] = {}
+    for key in keys:
+        value = variables[key]
+        if type(value) is str:
+            strings[key] = value
+        elif isinstance(value, (str, int, float)):
+            strings[key] = str(value)
+        else:
+            raise PromptTemplateError(
+                f"Variable '{key}' must resolve to a string-compatible value, got {type(value)!r}"
+            )
+    return strings
 
 
-def _select_madlib_value(context: _ResolutionContext, key: str) -> str:
+def _load_madlib_pool(madlib_dir: Path, key: str) -> tuple[tuple[str, ...], int]:
     file_name = key if key.endswith(".json") else f"{key}.json"
-    madlib_file = context.madlib_dir / file_name
-    choices = _load_madlib_choices(madlib_file)
-    if key in context.madlib_overrides:
-        selection = context.madlib_overrides[key]
-    else:
-        try:
-            selection = context.rng.choice(choices)
-        except IndexError as exc:  # pragma: no cover - defensive guard
-            raise PromptTemplateError(
-                f"Madlib file '{madlib_file}' does not contain any entries"
-            ) from exc
+    madlib_file = madlib_dir / file_name
+    choices = _load_madlib_choices(
+        madlib_file, _stat_or_raise(madlib_file, "Madlib file").st_mtime_ns
+    )
+    # Loaded choices are never empty, so ``choices[rng.randrange(size)]`` is the
+    # same draw as ``rng.choice(choices)``.
+    return choices, len(choices)
+
+
+def _load_template(path: Path, mtime_ns: int) -> Mapping[str, Any]:
+    data = _load_template_cached(path, mtime_ns)
+    if not isinstance(data, Mapping):
+        raise PromptTemplateError(f"Template '{path}' must contain a JSON object")
+    return data
+
 
-    context.selections.setdefault(key, []).append(selection)
-    return selection
+@lru_cache(maxsize=128)
+def _load_template_cached(path: Path, mtime_ns: int) -> Any:
+    # ``mtime_ns`` is only part of the cache key so edited templates are
+    # re-read; callers must treat the returned structure as read-only.
+    return _load_json(path)
 
 
 @lru_cache(maxsize=256)
-def _load_madlib_choices(path: Path) -> tuple[str, ...]:
-    if not path.exists():
-        raise PromptTemplateError(f"Madlib file not found: {path}")
+def _load_madlib_choices(path: Path, mtime_ns: int) -> tuple[str, ...]:
     raw = _load_json(path)
     if not isinstance(raw, Iterable) or isinstance(raw, (dict, str, bytes)):
         raise PromptTemplateError(
             f"Madlib file '{path}' must contain a JSON array of strings"
         )
 
-    choices: list[str] = []
-    for item in raw:
-        if not isinstance(item, str):
-            raise PromptTemplateError(
-                f"Madlib file '{path}' contains non-string entry: {item!r}"
-            )
-        cleaned = item.strip()
-        if cleaned:
-            choices.append(cleaned)
+    if not all(isinstance(item, str) for item in raw):
+        bad = next(item for item in raw if not isinstance(item, str))
+        raise PromptTemplateError(
+            f"Madlib file '{path}' contains non-string entry: {bad!r}"
+        )
 
+    # Interned so fragments repeated across madlib files share storage.
+    choices = tuple(
+        sys.intern(cleaned) for cleaned in (item.strip() for item in raw) if cleaned
+    )
     if not choices:
         raise PromptTemplateError(
             f"Madlib file '{path}' does not contain any usable string entries"
         )
 
-    return tuple(choices)
+    return choices
+
+
+def _stat_or_raise(path: Path, label: str) -> os.stat_result:
+    # One ``stat`` answers both "does it exist" and "what kind/age is it".
+    try:
+        return os.stat(path)
+    except (FileNotFoundError, NotADirectoryError) as exc:
+        raise PromptTemplateError(f"{label} not found: {path}") from exc
 
 
 def _load_json(path: Path) -> Any:
+    data = path.read_bytes()
     try:
-        return json.loads(path.read_text(encoding="utf-8"))
+        return _json_loads(data)
     except json.JSONDecodeError as exc:  # pragma: no cover - defensive guard
         raise PromptTemplateError(f"Invalid JSON in {path}: {exc}") from exc
 
 
 def _validate_keys(
-    provided: Mapping[str, Any], allowed: set[str], label: str
+    provided: Mapping[str, Any], allowed: frozenset[str], label: str
 ) -> None:
-    invalid = set(provided) - allowed
-    if invalid:
-        names = ", ".join(sorted(invalid))
-        raise PromptTemplateError(
-            f"Unsupported key(s) for {label}: {names}. Allowed: {sorted(allowed)}"
-        )
+    if allowed.issuperset(provided):
+        return
+    names = ", ".join(sorted(set(provided) - allowed))
+    raise PromptTemplateError(
+        f"Unsupported key(s) for {label}: {names}. Allowed: {sorted(allowed)}"
+    )
 
 
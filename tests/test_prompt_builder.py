@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import json
+import os
 import random
 from pathlib import Path
 
@@ -124,3 +125,199 @@ def test_unknown_text_setting_key(tmp_prompts: Path) -> None:
         )
 
 
+def test_edited_template_is_reloaded(tmp_prompts: Path) -> None:
+    template = tmp_prompts / "gen-image-tweet.json"
+    first = render_prompt(template, variables={"imageprompt": "x"})
+    assert first["aspect_ratio"] == "1:1"
+
+    template.write_text(
+        json.dumps({"type": "image", "prompt": "${var:imageprompt}", "aspect_ratio": "4:5"}),
+        encoding="utf-8",
+    )
+    stat = template.stat()
+    os.utime(template, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    second = render_prompt(template, variables={"imageprompt": "x"})
+    assert second["aspect_ratio"] == "4:5"
+
+
+def test_render_nested_structure_resolves_in_order(tmp_prompts: Path) -> None:
+    template = tmp_prompts / "nested.json"
+    template.write_text(
+        json.dumps(
+            {
+                "type": "text",
+                "prompt": "${madlib:mood} / ${var:tweet} / ${madlib:mood}",
+                "extra": [{"scene": "${madlib:scene}"}, 3, None],
+            }
+        ),
+        encoding="utf-8",
+    )
+    selections: dict[str, list[str]] = {}
+
+    result = render_prompt(
+        template,
+        variables={"tweet": "gm"},
+        rng=random.Random(5),
+        selection_log=selections,
+    )
+
+    first, tweet, second = result["prompt"].split(" / ")
+    assert tweet == "gm"
+    assert selections["mood"] == [first, second]
+    assert result["extra"] == [{"scene": selections["scene"][0]}, 3, None]
+
+
+def test_customized_render_matches_cached_render(tmp_prompts: Path) -> None:
+    template = tmp_prompts / "nested.json"
+    template.write_text(
+        json.dumps(
+            {
+                "type": "text",
+                "prompt": "${madlib:mood} / ${var:tweet} / ${madlib:mood}",
+                "extra": [{"scene": "${madlib:scene}"}, 3, None],
+            }
+        ),
+        encoding="utf-8",
+    )
+
+    cached = render_prompt(template, variables={"tweet": "gm"}, rng=random.Random(5))
+    customized = render_prompt(
+        template,
+        variables={"tweet": "gm"},
+        rng=random.Random(5),
+        overrides={"tags": ("${madlib:topic}", "fixed")},
+    )
+
+    tags = customized.pop("tags")
+    assert customized == cached
+    assert isinstance(tags, tuple) and tags[1] == "fixed"
+    assert tags[0] in {"Topic A", "Topic B"}
+
+
+def test_unsupported_placeholder_prefix_raises(tmp_prompts: Path) -> None:
+    with pytest.raises(PromptTemplateError):
+        render_prompt(
+            tmp_prompts / "gen-text-tweet.json",
+            overrides={"prompt": "${env:HOME}"},
+        )
+
+
+def test_literal_braces_survive_rendering(tmp_prompts: Path) -> None:
+    result = render_prompt(
+        tmp_prompts / "gen-image-tweet.json",
+        variables={"imageprompt": "{not a field}"},
+        overrides={"prompt": '{"json": ${var:imageprompt}}'},
+    )
+
+    assert result["prompt"] == '{"json": {not a field}}'
+
+
+def test_static_subtrees_are_reused_across_renders(tmp_prompts: Path) -> None:
+    template = tmp_prompts / "static.json"
+    template.write_text(
+        json.dumps(
+            {
+                "type": "image",
+                "prompt": "${var:imageprompt}",
+                "image_input": ["./logo.png"],
+            }
+        ),
+        encoding="utf-8",
+    )
+
+    first = render_prompt(template, variables={"imageprompt": "a"})
+    second = render_prompt(template, variables={"imageprompt": "b"})
+
+    assert first is not second
+    assert first["image_input"] == ["./logo.png"]
+    assert first["image_input"] is second["image_input"]
+    assert (first["prompt"], second["prompt"]) == ("a", "b")
+
+
+def test_static_template_skips_madlib_directory(tmp_path: Path) -> None:
+    template = tmp_path / "static.json"
+    template.write_text(
+        json.dumps({"type": "image", "aspect_ratio": "1:1"}), encoding="utf-8"
+    )
+
+    first = render_prompt(template)
+    first["aspect_ratio"] = "mutated"
+
+    assert render_prompt(template) == {"type": "image", "aspect_ratio": "1:1"}
+
+
+def test_variables_are_coerced_and_type_checked(tmp_prompts: Path) -> None:
+    template = tmp_prompts / "gen-image-tweet.json"
+
+    result = render_prompt(template, variables={"imageprompt": 42})
+    assert result["prompt"] == "42"
+
+    with pytest.raises(PromptTemplateError):
+        render_prompt(template, variables={"imageprompt": ["not", "a", "string"]})
+
+
+def test_madlib_override_applies_to_every_occurrence(tmp_prompts: Path) -> None:
+    template = tmp_prompts / "repeat.json"
+    template.write_text(
+        json.dumps({"type": "text", "prompt": "${madlib:topic} ${madlib:topic}"}),
+        encoding="utf-8",
+    )
+    selections: dict[str, list[str]] = {}
+
+    result = render_prompt(
+        template,
+        selection_log=selections,
+        madlib_overrides={"topic": "Fixed"},
+    )
+
+    assert result["prompt"] == "Fixed Fixed"
+    assert selections == {"topic": ["Fixed", "Fixed"]}
+
+
+def test_madlib_file_with_non_string_entry_raises(tmp_prompts: Path) -> None:
+    (tmp_prompts / "madlib" / "topic.json").write_text(
+        json.dumps(["Topic A", None]), encoding="utf-8"
+    )
+
+    with pytest.raises(PromptTemplateError, match="non-string entry: None"):
+        render_prompt(tmp_prompts / "gen-text-tweet.json")
+
+
+def test_nested_madlib_key_resolves(tmp_prompts: Path) -> None:
+    nested = tmp_prompts / "madlib" / "crypto"
+    nested.mkdir()
+    (nested / "coin.json").write_text(json.dumps(["CL8Y"]), encoding="utf-8")
+    template = tmp_prompts / "nested.json"
+    template.write_text(
+        json.dumps({"type": "text", "prompt": "${madlib:crypto/coin}"}),
+        encoding="utf-8",
+    )
+
+    assert render_prompt(template)["prompt"] == "CL8Y"
+
+
+def test_missing_madlib_file_raises(tmp_prompts: Path) -> None:
+    template = tmp_prompts / "missing.json"
+    template.write_text(
+        json.dumps({"type": "text", "prompt": "${madlib:unknown}"}), encoding="utf-8"
+    )
+
+    with pytest.raises(PromptTemplateError, match="Madlib file not found"):
+        render_prompt(template)
+
+
+def test_madlib_key_below_a_file_raises_template_error(tmp_prompts: Path) -> None:
+    template = tmp_prompts / "below-file.json"
+    template.write_text(
+        json.dumps({"type": "text", "prompt": "${madlib:mood.json/x}"}),
+        encoding="utf-8",
+    )
+
+    with pytest.raises(PromptTemplateError, match="Madlib file not found"):
+        render_prompt(template)
+    with pytest.raises(PromptTemplateError, match="Template not found"):
+        render_prompt(template / "nested.json")
+
+
+
@@ -2,10 +2,16 @@
 
 from __future__ import annotations
 
+import argparse
+import asyncio
 import io
+import random
+from collections import OrderedDict
 from pathlib import Path
+from types import SimpleNamespace
 from typing import Any
 
+import httpx
 import pytest
 
 import tweet_generator as tg
@@ -17,6 +23,26 @@ def _temp_image_path(tmp_path: Path, data: bytes = b"stub") -> Path:
     return path
 
 
+def _use_fake_replicate(monkeypatch: pytest.MonkeyPatch, async_run: Any) -> None:
+    monkeypatch.setattr(
+        tg, "_replicate_client", lambda: SimpleNamespace(async_run=async_run)
+    )
+
+
+def _batch_args(**overrides: Any) -> argparse.Namespace:
+    values: dict[str, Any] = {
+        "count": 3,
+        "concurrency": 3,
+        "use_cache": False,
+        "seed": 7,
+        "madlib_topic": None,
+        "image_prefix": "img",
+        "json_prefix": "out",
+    }
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+
 def test_append_tweet_index_appends_entry(tmp_path: Path) -> None:
     json_path = tmp_path / "tweet_output_1.json"
     image_path = tmp_path / "tweet_image_1.jpg"
@@ -29,6 +55,8 @@ def test_append_tweet_index_appends_entry(tmp_path: Path) -> None:
         json_path=json_path,
         image_path=image_path,
     )
+    assert not (tmp_path / "tweets.txt").exists()
+    tg._flush_tweet_index()
 
     index_path = tmp_path / "tweets.txt"
     content = index_path.read_text(encoding="utf-8")
@@ -49,6 +77,14 @@ def test_coerce_text_output_handles_list_bytes() -> None:
     assert tg._coerce_text_output(output) == "Hello world"
 
 
+def test_coerce_text_output_handles_exact_types() -> None:
+    assert tg._coerce_text_output(None) == ""
+    assert tg._coerce_text_output(b"raw") == "raw"
+    assert tg._coerce_text_output(["a", "b"]) == "ab"
+    assert tg._coerce_text_output(iter(["c", None, "d"])) == "cd"
+    assert tg._coerce_text_output({"output": ["e", 1]}) == "e1"
+
+
 def test_persist_image_output_saves_file_like(tmp_path: Path) -> None:
     file_like = io.BytesIO(b"fake image data")
     path = tg._persist_image_output(
@@ -64,17 +100,8 @@ def test_persist_image_output_saves_file_like(tmp_path: Path) -> None:
 def test_persist_image_output_downloads_url(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
     url = "https://example.com/image.png"
 
-    class DummyResponse:
-        def __enter__(self) -> "DummyResponse":
-            return self
-
-        def __exit__(self, *args: Any) -> None:  # pragma: no cover - nothing to do
-            return None
-
-        def read(self) -> bytes:
-            return b"downloaded"
-
-    monkeypatch.setattr(tg, "urlopen", lambda _: DummyResponse())
+    transport = httpx.MockTransport(lambda _: httpx.Response(200, content=b"downloaded"))
+    monkeypatch.setattr(tg, "_http_client", lambda: httpx.Client(transport=transport))
     path = tg._persist_image_output(
         url,
         output_dir=tmp_path,
@@ -85,6 +112,21 @@ def test_persist_image_output_downloads_url(monkeypatch: pytest.MonkeyPatch, tmp
     assert path.read_bytes() == b"downloaded"
 
 
+def test_persist_image_output_skips_unusable_entries(tmp_path: Path) -> None:
+    output = ["not a url", {"meta": 1, "image": io.BytesIO(b"nested")}]
+
+    path = tg._persist_image_output(
+        output, output_dir=tmp_path, prefix="out", default_suffix=".png"
+    )
+
+    assert path.name.startswith("out_2_")
+    assert path.read_bytes() == b"nested"
+    with pytest.raises(RuntimeError, match="Unable to persist"):
+        tg._persist_image_output(
+            ["not a url", 42], output_dir=tmp_path, prefix="out", default_suffix=".png"
+        )
+
+
 def test_open_binary_file_rejects_missing(tmp_path: Path) -> None:
     with pytest.raises(RuntimeError):
         tg._open_binary_file(tmp_path / "missing.png")
@@ -99,3 +141,324 @@ def test_open_binary_file_opens_existing(tmp_path: Path) -> None:
         handle.close()
 
 
+def test_main_async_generates_requested_count(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    async def fake_async_run(model_id: str, input: dict[str, Any]) -> Any:
+        if model_id == "image-model":
+            return io.BytesIO(b"image bytes")
+        return ["generated ", "text"]
+
+    monkeypatch.chdir(tg.REPO_ROOT)
+    _use_fake_replicate(monkeypatch, fake_async_run)
+    args = _batch_args(concurrency=2, madlib_topic="Fixed Topic")
+
+    result = asyncio.run(
+        tg.main_async(
+            args,
+            text_model="text-model",
+            image_model="image-model",
+            output_dir=tmp_path,
+        )
+    )
+
+    assert result == 0
+    assert len(list(tmp_path.glob("out_*.json"))) == 3
+    assert len(list(tmp_path.glob("img_*.jpg"))) == 3
+    assert (tmp_path / "tweets.txt").read_text(encoding="utf-8").count("generated text") == 3
+
+
+def test_main_async_summary_failure_does_not_cancel_other_tweets(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    async def fake_async_run(model_id: str, input: dict[str, Any]) -> Any:
+        if model_id == "image-model":
+            return io.BytesIO(b"image bytes")
+        return "generated text"
+
+    real_encode = tg._encode_summary
+    failures = iter([True])
+
+    def flaky_encode(summary: dict[str, Any]) -> bytes:
+        if next(failures, False):
+            raise OSError("disk full")
+        return real_encode(summary)
+
+    monkeypatch.chdir(tg.REPO_ROOT)
+    _use_fake_replicate(monkeypatch, fake_async_run)
+    monkeypatch.setattr(tg, "_encode_summary", flaky_encode)
+    args = _batch_args()
+
+    result = asyncio.run(
+        tg.main_async(
+            args, text_model="text-model", image_model="image-model", output_dir=tmp_path
+        )
+    )
+
+    assert result == 1
+    assert len(list(tmp_path.glob("out_*.json"))) == 2
+    assert len(list(tmp_path.glob("img_*.jpg"))) == 3
+
+
+def test_main_async_batches_tweet_texts_when_supported(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    text_inputs: list[Any] = []
+
+    async def fake_async_run(model_id: str, input: dict[str, Any]) -> Any:
+        if model_id == "image-model":
+            return io.BytesIO(b"image bytes")
+        text_inputs.append(input["prompt"])
+        if isinstance(input["prompt"], list):
+            choices = [{"text": f"tweet {i}"} for i in range(len(input["prompt"]))]
+            return {"choices": choices}
+        return "image prompt"
+
+    monkeypatch.chdir(tg.REPO_ROOT)
+    monkeypatch.setenv(tg.TEXT_BATCH_ENV, "1")
+    _use_fake_replicate(monkeypatch, fake_async_run)
+    args = _batch_args()
+
+    result = asyncio.run(
+        tg.main_async(
+            args, text_model="text-model", image_model="image-model", output_dir=tmp_path
+        )
+    )
+
+    assert result == 0
+    assert isinstance(text_inputs[0], list) and len(text_inputs[0]) == 3
+    assert len(text_inputs) == 4  # one batched request plus one image prompt each
+    index = (tmp_path / "tweets.txt").read_text(encoding="utf-8")
+    assert all(f"tweet {i}" in index for i in range(3))
+
+
+def test_split_batched_text_output_rejects_token_streams() -> None:
+    assert tg._split_batched_text_output({"choices": [{"text": "a"}, "b"]}) == ["a", "b"]
+    assert tg._split_batched_text_output([["Burn ", "it"], ["gm"]]) == ["Burn it", "gm"]
+    with pytest.raises(RuntimeError, match="single token stream"):
+        tg._split_batched_text_output(["Burn ", "it"])
+
+
+def test_tweet_rngs_do_not_overlap_across_seeds() -> None:
+    def draws(seed: int, index: int) -> list[float]:
+        rng = tg._tweet_rng(seed, index)
+        assert rng is not None
+        return [rng.random() for _ in range(3)]
+
+    single = random.Random(1)
+    assert draws(1, 0) == [single.random() for _ in range(3)]
+    assert draws(1, 1) != draws(2, 0)
+    assert draws(1, 1) == draws(1, 1)
+    assert tg._tweet_rng(None, 3) is None
+
+
+def test_build_model_input_honours_cache_flag(monkeypatch: pytest.MonkeyPatch) -> None:
+    payload = {"type": "text", "prompt": "hello"}
+
+    monkeypatch.delenv(tg.USE_CACHE_ENV, raising=False)
+    assert tg._build_model_input(payload) == {"prompt": "hello"}
+
+    monkeypatch.setenv(tg.USE_CACHE_ENV, "1")
+    assert tg._build_model_input(payload) == {"prompt": "hello", "use_cache": True}
+    assert tg._build_model_input({**payload, "use_cache": False})["use_cache"] is False
+
+
+def test_run_text_model_reuses_cached_output(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    calls: list[str] = []
+
+    async def fake_async_run(model_id: str, input: dict[str, Any]) -> Any:
+        calls.append(input["prompt"])
+        return f"reply {len(calls)}"
+
+    _use_fake_replicate(monkeypatch, fake_async_run)
+    memo: OrderedDict[str, str] = OrderedDict()
+    monkeypatch.setattr(tg, "_text_memo", memo)
+    payload = {"type": "text", "prompt": "hello"}
+
+    first = asyncio.run(tg._run_text_model("model", payload, cache_dir=tmp_path))
+    (entry,) = (tmp_path / "text").iterdir()
+    entry.write_text("reply from disk", encoding="utf-8")
+    memo.clear()
+    second = asyncio.run(tg._run_text_model("model", payload, cache_dir=tmp_path))
+
+    assert (first, second) == ("reply 1", "reply from disk")
+    assert calls == ["hello"]
+
+
+def test_run_text_model_memoizes_cached_results_in_process(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    calls: list[str] = []
+
+    async def fake_async_run(model_id: str, input: dict[str, Any]) -> Any:
+        calls.append(input["prompt"])
+        return f"reply {len(calls)}"
+
+    _use_fake_replicate(monkeypatch, fake_async_run)
+    monkeypatch.setattr(tg, "_text_memo", OrderedDict())
+    payload = {"type": "text", "prompt": "memo"}
+
+    first = asyncio.run(tg._run_text_model("model", payload, cache_dir=tmp_path))
+    for entry in (tmp_path / "text").iterdir():
+        entry.unlink()
+    second = asyncio.run(tg._run_text_model("model", payload, cache_dir=tmp_path))
+    uncached = asyncio.run(tg._run_text_model("model", payload))
+
+    assert (first, second, uncached) == ("reply 1", "reply 1", "reply 2")
+
+
+def test_run_image_model_closes_image_inputs(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    source = _temp_image_path(tmp_path)
+    seen: list[Any] = []
+
+    async def fake_async_run(model_id: str, input: dict[str, Any]) -> Any:
+        seen.extend(input["image_input"])
+        assert not any(handle.closed for handle in seen)
+        return io.BytesIO(b"image")
+
+    _use_fake_replicate(monkeypatch, fake_async_run)
+    payload = {"type": "image", "prompt": "draw", "image_input": [str(source)] * 2}
+
+    path = asyncio.run(tg._run_image_model("model", payload, tmp_path, prefix="img"))
+
+    assert path.read_bytes() == b"image"
+    assert len(seen) == 2 and all(handle.closed for handle in seen)
+
+
+def test_run_image_model_keeps_single_file_output_file_like(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    class FakeFileOutput:
+        def read(self) -> bytes:
+            return b"single file"
+
+        def __aiter__(self) -> Any:
+            raise AssertionError("file outputs must not be drained as async streams")
+
+    async def fake_async_run(model_id: str, input: dict[str, Any]) -> Any:
+        return FakeFileOutput()
+
+    _use_fake_replicate(monkeypatch, fake_async_run)
+
+    path = asyncio.run(
+        tg._run_image_model("model", {"prompt": "draw"}, tmp_path, prefix="img")
+    )
+
+    assert path.read_bytes() == b"single file"
+
+
+def test_run_image_model_reuses_cached_image(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    calls: list[str] = []
+
+    async def fake_async_run(model_id: str, input: dict[str, Any]) -> Any:
+        calls.append(input["prompt"])
+        return io.BytesIO(b"image")
+
+    _use_fake_replicate(monkeypatch, fake_async_run)
+    payload = {"type": "image", "prompt": "cached draw"}
+
+    async def run_twice() -> list[Path]:
+        return [
+            await tg._run_image_model(
+                "model", payload, tmp_path, prefix="img", cache_dir=tmp_path / ".cache"
+            )
+            for _ in range(2)
+        ]
+
+    first, second = asyncio.run(run_twice())
+
+    assert calls == ["cached draw"]
+    assert first != second
+    assert second.read_bytes() == b"image"
+
+
+def test_cache_write_failures_do_not_fail_the_call(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    async def fake_async_run(model_id: str, input: dict[str, Any]) -> Any:
+        return io.BytesIO(b"image") if model_id == "image-model" else "text"
+
+    def broken_write(path: Path, source: Any) -> None:
+        raise OSError("read-only cache")
+
+    _use_fake_replicate(monkeypatch, fake_async_run)
+    monkeypatch.setattr(tg, "_write_cache_entry", broken_write)
+    monkeypatch.setattr(tg, "_text_memo", OrderedDict())
+    cache_dir = tmp_path / ".cache"
+
+    async def run_both() -> tuple[str, Path]:
+        text = await tg._run_text_model(
+            "text-model", {"prompt": "uncacheable"}, cache_dir=cache_dir
+        )
+        image = await tg._run_image_model(
+            "image-model",
+            {"prompt": "uncacheable"},
+            tmp_path,
+            prefix="img",
+            cache_dir=cache_dir,
+        )
+        return text, image
+
+    text, image = asyncio.run(run_both())
+
+    assert text == "text"
+    assert image.read_bytes() == b"image"
+
+
+def test_write_cache_entry_removes_temp_file_on_failure(tmp_path: Path) -> None:
+    class BrokenSource(io.RawIOBase):
+        def readinto(self, buffer: Any) -> int:
+            raise OSError("read failed")
+
+    with pytest.raises(OSError):
+        tg._write_cache_entry(tmp_path / "entry.txt", BrokenSource())
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_open_new_output_reserves_unique_names(tmp_path: Path) -> None:
+    paths = []
+    for index in range(5):
+        with tg._open_new_output(tmp_path, prefix="out", suffix=".json") as (path, handle):
+            handle.write(str(index).encode())
+        paths.append(path)
+
+    assert len(set(paths)) == 5
+    assert [path.read_bytes() for path in paths] == [b"0", b"1", b"2", b"3", b"4"]
+
+
+def test_open_new_output_removes_file_on_failure(tmp_path: Path) -> None:
+    with pytest.raises(OSError):
+        with tg._open_new_output(tmp_path, prefix="out", suffix=".json") as (path, _):
+            raise OSError("write failed")
+
+    assert not path.exists()
+
+
+def test_persist_image_output_streams_iterable_file_output(tmp_path: Path) -> None:
+    class ChunkedOutput:
+        """Mimics replicate's FileOutput: unsized read() plus chunk iteration."""
+
+        def read(self) -> bytes:  # pragma: no cover - streaming path is used
+            raise AssertionError("should stream chunks instead of reading")
+
+        def __iter__(self):
+            yield b"chunk-1 "
+            yield b"chunk-2"
+
+    path = tg._persist_image_output(
+        ChunkedOutput(),
+        output_dir=tmp_path,
+        prefix="out",
+        default_suffix=".png",
+    )
+
+    assert path.read_bytes() == b"chunk-1 chunk-2"
+
+
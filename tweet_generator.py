@@ -4,21 +4,44 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import atexit
+import contextlib
+import hashlib
+import importlib.util
+import io
 import json
 import os
+import random
+import shutil
 import sys
+import tempfile
+from collections import OrderedDict
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Iterable
+from typing import TYPE_CHECKING, Any, BinaryIO, Callable, Iterable, Iterator
 from urllib.parse import urlparse
-from urllib.request import urlopen
 
-from dotenv import load_dotenv
+# ``orjson`` is optional; both encoders produce the same indented UTF-8 JSON.
+try:
+    from orjson import OPT_INDENT_2, dumps as _orjson_dumps
+except ImportError:  # pragma: no cover - depends on the environment
+    _orjson_dumps = None
 
-import replicate
+try:  # pragma: no cover - platform dependent
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no flock
+    fcntl = None
 
 from prompt_builder import PromptTemplateError, render_prompt
 
+# ``replicate``, ``httpx`` and ``dotenv`` are imported where first used; they
+# account for most of the CLI's start-up time.
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    import httpx
+    import replicate
+
 
 REPO_ROOT = Path(__file__).resolve().parent
 PROMPTS_DIR = REPO_ROOT / "prompts"
@@ -28,7 +51,36 @@ IMAGE_TEXT_PROMPT_PATH = PROMPTS_DIR / "gen-text-imageprompt.json"
 IMAGE_PROMPT_PATH = PROMPTS_DIR / "gen-image-tweet.json"
 DEFAULT_OUTPUT_DIR = REPO_ROOT / "replicate_tweet_outputs"
 
+USE_CACHE_ENV = "REPLICATE_USE_CACHE"
+TEXT_BATCH_ENV = "TEXT_MODEL_SUPPORTS_BATCH"
+CACHE_SUBDIR = ".cache"
+
 _MAX_OUTPUT_HISTORY = 1_000_000
+_FILE_TIMESTAMP_FORMAT = "%Y%m%dT%H%M%S"
+_URL_PREFIXES = ("http://", "https://")
+_MAX_OUTPUT_COUNTERS = 1024
+_MAX_TEXT_MEMO = 256
+_COPY_CHUNK_SIZE = 1 << 20
+
+# Next free counter per (directory, prefix, timestamp, suffix), so files saved
+# within the same second skip names that are already taken.
+_output_counters: dict[tuple[Path, str, str, str], int] = {}
+
+# Directories already created by this process.
+_ensured_dirs: set[Path] = set()
+
+# Encoded ``tweets.txt`` entries waiting to be appended, keyed by index path.
+_index_buffer: dict[Path, list[bytes]] = {}
+
+# Most recent text results by cache key, consulted before the on-disk cache.
+_text_memo: OrderedDict[str, str] = OrderedDict()
+
+
+def _ensure_dir(path: Path) -> None:
+    if path in _ensured_dirs:
+        return
+    path.mkdir(parents=True, exist_ok=True)
+    _ensured_dirs.add(path)
 
 
 def _ensure_env(var_name: str, *, fallback_names: tuple[str, ...] = ()) -> str:
@@ -83,6 +135,20 @@ def _parse_args() -> argparse.Namespace:
         default=1,
         help="Number of tweets to generate (default: 1).",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Maximum number of tweets generated in parallel (default: 4).",
+    )
+    parser.add_argument(
+        "--use-cache",
+        action="store_true",
+        help=(
+            "Reuse earlier model results for identical inputs, stored under "
+            "<output-dir>/.cache."
+        ),
+    )
     parser.add_argument(
         "--madlib-topic",
         default=None,
@@ -97,42 +163,168 @@ def _parse_args() -> argparse.Namespace:
 def main() -> int:
     args = _parse_args()
 
+    from dotenv import load_dotenv
+
     load_dotenv()
 
-    api_token = _ensure_env("REPLICATE_API_TOKEN", fallback_names=("REPLICATE_API_KEY",))
+    # Exports a REPLICATE_API_KEY fallback as REPLICATE_API_TOKEN for the client.
+    _ensure_env("REPLICATE_API_TOKEN", fallback_names=("REPLICATE_API_KEY",))
     text_model = _ensure_env("TEXT_MODEL")
     image_model = _ensure_env("IMAGE_MODEL")
-    os.environ["REPLICATE_API_TOKEN"] = api_token
 
     output_dir = Path(args.output_dir)
-    output_dir.mkdir(parents=True, exist_ok=True)
+    _ensure_dir(output_dir)
+
+    return asyncio.run(
+        main_async(
+            args,
+            text_model=text_model,
+            image_model=image_model,
+            output_dir=output_dir,
+        )
+    )
+
 
-    rng = None
-    if args.seed is not None:
-        from random import Random
+async def main_async(
+    args: argparse.Namespace,
+    *,
+    text_model: str,
+    image_model: str,
+    output_dir: Path,
+) -> int:
+    """Generate ``args.count`` tweets concurrently and report the outcome."""
+
+    madlib_overrides: dict[str, str] = {}
+    if args.madlib_topic:
+        madlib_overrides["topic"] = args.madlib_topic
+
+    rngs = [_tweet_rng(args.seed, index) for index in range(args.count)]
+    madlib_logs: list[dict[str, list[str]]] = [{} for _ in range(args.count)]
+    tweet_texts: list[str | None] = [None] * args.count
+    if args.count > 1 and _env_flag(TEXT_BATCH_ENV):
+        batched = await _batch_tweet_texts(
+            text_model,
+            rngs=rngs,
+            madlib_logs=madlib_logs,
+            madlib_overrides=madlib_overrides,
+        )
+        if batched is None:
+            # Start the fan-out from the same draws a non-batched run makes.
+            rngs = [_tweet_rng(args.seed, index) for index in range(args.count)]
+            madlib_logs = [{} for _ in range(args.count)]
+        else:
+            tweet_texts = batched
+
+    semaphore = asyncio.Semaphore(max(1, args.concurrency))
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [
+                group.create_task(
+                    _generate_one(
+                        index,
+                        args=args,
+                        text_model=text_model,
+                        image_model=image_model,
+                        output_dir=output_dir,
+                        madlib_overrides=madlib_overrides,
+                        semaphore=semaphore,
+                        rng=rngs[index],
+                        madlib_log=madlib_logs[index],
+                        tweet_text=tweet_texts[index],
+                    )
+                )
+                for index in range(args.count)
+            ]
+    finally:
+        _flush_tweet_index()
 
-        rng = Random(args.seed)
+    successful_count = sum(task.result() for task in tasks)
+    failed_count = args.count - successful_count
 
-    successful_count = 0
-    failed_count = 0
+    print(f"\n=== Generation Complete ===")
+    print(f"Successfully generated: {successful_count}/{args.count}")
+    if failed_count > 0:
+        print(f"Failed: {failed_count}/{args.count}")
+        return 1
+    return 0
 
-    for i in range(args.count):
-        print(f"\n--- Generating tweet {i+1}/{args.count} ---")
-        madlib_log: dict[str, list[str]] = {}
 
-        try:
-            madlib_overrides: dict[str, str] = {}
-            if args.madlib_topic:
-                madlib_overrides["topic"] = args.madlib_topic
+def _tweet_rng(seed: int | None, index: int) -> random.Random | None:
+    # Tweets finish in network order, so each one draws from its own seeded
+    # generator; the first tweet matches a single-tweet run with the same seed.
+    # Later tweets hash ``(seed, index)`` into their seed so batches run with
+    # neighbouring seeds do not share tweets.
+    if seed is None:
+        return None
+    if index == 0:
+        return random.Random(seed)
+    return random.Random(f"{seed}:{index}")
+
+
+async def _batch_tweet_texts(
+    text_model: str,
+    *,
+    rngs: list[random.Random | None],
+    madlib_logs: list[dict[str, list[str]]],
+    madlib_overrides: dict[str, str],
+) -> list[str] | None:
+    """Generate every tweet text with one request, or ``None`` if that fails."""
 
-            tweet_payload = render_prompt(
+    print(f"\n--- Generating {len(rngs)} tweet texts in one batched request ---")
+    try:
+        payloads = [
+            render_prompt(
                 TEXT_PROMPT_PATH,
                 madlib_dir=MADLIB_DIR,
                 rng=rng,
                 selection_log=madlib_log,
                 madlib_overrides=madlib_overrides,
             )
-            tweet_text = _run_text_model(text_model, tweet_payload).strip()
+            for rng, madlib_log in zip(rngs, madlib_logs)
+        ]
+        return await _run_text_model_batched(text_model, payloads)
+    except Exception as exc:  # pylint: disable=broad-except
+        print(
+            f"Batched text generation failed, sending one request per tweet: {exc}",
+            file=sys.stderr,
+        )
+        return None
+
+
+async def _generate_one(
+    index: int,
+    *,
+    args: argparse.Namespace,
+    text_model: str,
+    image_model: str,
+    output_dir: Path,
+    madlib_overrides: dict[str, str],
+    semaphore: asyncio.Semaphore,
+    rng: random.Random | None,
+    madlib_log: dict[str, list[str]],
+    tweet_text: str | None = None,
+) -> bool:
+    label = f"{index + 1}/{args.count}"
+    cache_dir = output_dir / CACHE_SUBDIR if args.use_cache else None
+
+    async with semaphore:
+        print(f"\n--- Generating tweet {label} ---")
+        # One clock read names every file of this tweet and its index entry.
+        started = datetime.utcnow()
+        file_timestamp = started.strftime(_FILE_TIMESTAMP_FORMAT)
+        try:
+            if tweet_text is None:
+                tweet_payload = render_prompt(
+                    TEXT_PROMPT_PATH,
+                    madlib_dir=MADLIB_DIR,
+                    rng=rng,
+                    selection_log=madlib_log,
+                    madlib_overrides=madlib_overrides,
+                )
+                tweet_text = await _run_text_model(
+                    text_model, tweet_payload, cache_dir=cache_dir
+                )
+            tweet_text = tweet_text.strip()
             if not tweet_text:
                 raise RuntimeError("Text model returned empty tweet content.")
 
@@ -144,7 +336,11 @@ def main() -> int:
                 selection_log=madlib_log,
                 madlib_overrides=madlib_overrides,
             )
-            image_prompt = _run_text_model(text_model, image_prompt_payload).strip()
+            image_prompt = (
+                await _run_text_model(
+                    text_model, image_prompt_payload, cache_dir=cache_dir
+                )
+            ).strip()
             if not image_prompt:
                 raise RuntimeError("Image prompt generation returned empty prompt.")
 
@@ -157,113 +353,317 @@ def main() -> int:
                 madlib_overrides=madlib_overrides,
             )
 
-            image_path = _run_image_model(
+            image_path = await _run_image_model(
                 image_model,
                 image_generation_payload,
                 output_dir,
                 prefix=args.image_prefix,
+                cache_dir=cache_dir,
+                timestamp=file_timestamp,
             )
 
         except PromptTemplateError as exc:
-            print(f"Prompt templating failed: {exc}", file=sys.stderr)
-            failed_count += 1
-            continue
+            print(f"[{label}] Prompt templating failed: {exc}", file=sys.stderr)
+            return False
         except Exception as exc:  # pylint: disable=broad-except
-            print(f"Generation failed: {exc}", file=sys.stderr)
-            failed_count += 1
-            continue
-
-        summary = {
-            "tweet": tweet_text,
-            "image": image_path.name,
-            "image_prompt": image_prompt,
-            "madlib": madlib_log,
-        }
-        summary_path = _next_output_path(
-            output_dir, prefix=args.json_prefix, suffix=".json"
-        )
-        summary_path.write_text(
-            json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8"
-        )
+            print(f"[{label}] Generation failed: {exc}", file=sys.stderr)
+            return False
+
+    summary = {
+        "tweet": tweet_text,
+        "image": image_path.name,
+        "image_prompt": image_prompt,
+        "madlib": madlib_log,
+    }
+    try:
+        with _open_new_output(
+            output_dir,
+            prefix=args.json_prefix,
+            suffix=".json",
+            timestamp=file_timestamp,
+        ) as (summary_path, handle):
+            handle.write(_encode_summary(summary))
 
         _append_tweet_index(
             output_dir=output_dir,
             tweet=tweet_text,
             json_path=summary_path,
             image_path=image_path,
+            timestamp=started.isoformat(timespec="seconds"),
+        )
+    except Exception as exc:  # pylint: disable=broad-except
+        # Raising here would make the TaskGroup cancel every other tweet.
+        print(f"[{label}] Saving tweet summary failed: {exc}", file=sys.stderr)
+        return False
+
+    print(f"[{label}] Tweet saved to {summary_path}")
+    print(f"[{label}] Image saved to {image_path}")
+    return True
+
+
+def _encode_summary(summary: dict[str, Any]) -> bytes:
+    if _orjson_dumps is not None:
+        return _orjson_dumps(summary, option=OPT_INDENT_2)
+    return json.dumps(summary, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+async def _run_text_model(
+    model_id: str, payload: dict[str, Any], *, cache_dir: Path | None = None
+) -> str:
+    input_payload = _build_model_input(payload)
+
+    # Identical inputs are only reused when caching was requested: without it,
+    # repeated prompts (e.g. a fixed --madlib-topic) must still sample afresh.
+    key = cache_path = None
+    if cache_dir is not None:
+        key = _cache_key(model_id, input_payload)
+        memoized = _text_memo.get(key)
+        if memoized is not None:
+            _text_memo.move_to_end(key)
+            return memoized
+        cache_path = cache_dir / "text" / f"{key}.txt"
+        # Cache reads and writes are blocking file I/O, as on the image path.
+        cached = await asyncio.to_thread(_read_cached_text, cache_path)
+        if cached is not None:
+            return _remember_text(key, cached)
+
+    output = await _replicate_client().async_run(model_id, input=input_payload)
+    text = _coerce_text_output(await _collect_async_output(output))
+    if key is not None and text.strip():
+        await asyncio.to_thread(_store_cached_text, cache_path, text)
+        _remember_text(key, text)
+    return text
+
+
+def _store_cached_text(cache_path: Path, text: str) -> None:
+    # The cache is optional; failing to fill it must not fail the tweet.
+    try:
+        _write_cache_entry(cache_path, io.BytesIO(text.encode("utf-8")))
+    except OSError as exc:
+        print(
+            f"Warning: could not write text cache {cache_path}: {exc}",
+            file=sys.stderr,
         )
 
-        print(f"Tweet saved to {summary_path}")
-        print(f"Image saved to {image_path}")
-        successful_count += 1
 
-    print(f"\n=== Generation Complete ===")
-    print(f"Successfully generated: {successful_count}/{args.count}")
-    if failed_count > 0:
-        print(f"Failed: {failed_count}/{args.count}")
-        return 1
-    return 0
+def _read_cached_text(cache_path: Path) -> str | None:
+    try:
+        return cache_path.read_bytes().decode("utf-8")
+    except FileNotFoundError:
+        return None
 
 
-def _run_text_model(model_id: str, payload: dict[str, Any]) -> str:
-    input_payload = _payload_without_type(payload)
-    output = replicate.run(model_id, input=input_payload)
-    return _coerce_text_output(output)
+def _remember_text(key: str, text: str) -> str:
+    _text_memo[key] = text
+    if len(_text_memo) > _MAX_TEXT_MEMO:
+        _text_memo.popitem(last=False)
+    return text
+
 
+async def _run_text_model_batched(
+    model_id: str, payloads: list[dict[str, Any]]
+) -> list[str]:
+    inputs = [_build_model_input(payload) for payload in payloads]
+    prompts = [input_payload.pop("prompt") for input_payload in inputs]
+    shared = inputs[0]
+    if any(input_payload != shared for input_payload in inputs[1:]):
+        raise RuntimeError("Batched prompts must share every setting but the prompt.")
 
-def _run_image_model(
+    output = await _replicate_client().async_run(
+        model_id, input={**shared, "prompt": prompts}
+    )
+    texts = _split_batched_text_output(await _collect_async_output(output))
+    if len(texts) != len(payloads):
+        raise RuntimeError(
+            f"Batched text model returned {len(texts)} outputs "
+            f"for {len(payloads)} prompts."
+        )
+    return texts
+
+
+def _split_batched_text_output(output: Any) -> list[str]:
+    # Accepts an OpenAI-style ``choices`` list, or one dict or token list per
+    # prompt. A flat list of strings is rejected: it is what a streamed single
+    # completion looks like once collected, so it cannot be split per prompt.
+    from_choices = isinstance(output, dict) and "choices" in output
+    if isinstance(output, dict):
+        output = output.get("choices", output.get("output"))
+    if not isinstance(output, (list, tuple)):
+        raise RuntimeError(f"Unexpected batched text output: {output!r}")
+    if not from_choices and not all(
+        isinstance(item, (dict, list, tuple)) for item in output
+    ):
+        raise RuntimeError(
+            "Batched text output looks like a single token stream, "
+            "not one completion per prompt."
+        )
+
+    texts = []
+    for item in output:
+        if isinstance(item, dict):
+            message = item.get("message")
+            if isinstance(message, dict):
+                item = message.get("content")
+            else:
+                item = item.get("text", item.get("output"))
+        texts.append(_coerce_text_output(item))
+    return texts
+
+
+async def _run_image_model(
     model_id: str,
     payload: dict[str, Any],
     output_dir: Path,
     *,
     prefix: str,
+    cache_dir: Path | None = None,
+    timestamp: str | None = None,
 ) -> Path:
-    input_payload = _payload_without_type(payload)
+    input_payload = _build_model_input(payload)
+
+    cache_stem = None
+    if cache_dir is not None:
+        # Keyed before the image inputs are swapped for open file handles.
+        cache_stem = cache_dir / "image" / _cache_key(model_id, input_payload)
+        # Cache lookups and copies are blocking file I/O, like persistence below.
+        path = await asyncio.to_thread(
+            _restore_cached_image,
+            cache_stem,
+            output_dir=output_dir,
+            prefix=prefix,
+            timestamp=timestamp,
+        )
+        if path is not None:
+            return path
 
-    image_inputs = input_payload.get("image_input")
-    opened_files: list[Any] = []
-    if image_inputs:
-        file_handles: list[Any] = []
-        for item in image_inputs:
-            handle = _open_binary_file(item)
-            opened_files.append(handle)
-            file_handles.append(handle)
-        input_payload["image_input"] = file_handles
+    with contextlib.ExitStack() as stack:
+        image_inputs = input_payload.get("image_input")
+        if image_inputs:
+            input_payload["image_input"] = [
+                stack.enter_context(_open_binary_file(item)) for item in image_inputs
+            ]
 
-    try:
-        output = replicate.run(model_id, input=input_payload)
-    except Exception as exc:  # pylint: disable=broad-except
-        raise RuntimeError(f"Image model invocation failed: {exc}") from exc
-    finally:
-        for handle in opened_files:
-            try:
-                handle.close()
-            except Exception:  # pragma: no cover - best effort cleanup
-                pass
+        try:
+            output = await _collect_async_output(
+                await _replicate_client().async_run(model_id, input=input_payload)
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            raise RuntimeError(f"Image model invocation failed: {exc}") from exc
 
     try:
-        return _persist_image_output(
-            output, output_dir=output_dir, prefix=prefix, default_suffix=".jpg"
+        # Reading file outputs and downloading URLs is blocking I/O, so it runs
+        # in a worker thread to keep other tweets progressing.
+        path = await asyncio.to_thread(
+            _persist_image_output,
+            output,
+            output_dir=output_dir,
+            prefix=prefix,
+            default_suffix=".jpg",
+            timestamp=timestamp,
         )
     except Exception as exc:  # pylint: disable=broad-except
         raise RuntimeError(f"No image content found in response: {output!r}") from exc
 
+    if cache_stem is not None:
+        await asyncio.to_thread(_store_cached_image, path, cache_stem)
+    return path
+
+
+def _restore_cached_image(
+    cache_stem: Path, *, output_dir: Path, prefix: str, timestamp: str | None
+) -> Path | None:
+    cached = next(cache_stem.parent.glob(f"{cache_stem.name}.*"), None)
+    if cached is None:
+        return None
+    with _open_new_output(
+        output_dir, prefix=prefix, suffix=cached.suffix, timestamp=timestamp
+    ) as (path, handle), cached.open("rb") as source:
+        shutil.copyfileobj(source, handle, _COPY_CHUNK_SIZE)
+    return path
+
+
+def _store_cached_image(path: Path, cache_stem: Path) -> None:
+    # The image is already saved; a cache failure must not fail the tweet.
+    cache_path = cache_stem.with_name(cache_stem.name + path.suffix)
+    try:
+        with path.open("rb") as image_file:
+            _write_cache_entry(cache_path, image_file)
+    except OSError as exc:
+        print(
+            f"Warning: could not write image cache {cache_path}: {exc}",
+            file=sys.stderr,
+        )
+
+
+def _cache_key(model_id: str, input_payload: dict[str, Any]) -> str:
+    canonical = json.dumps(
+        [model_id, input_payload], sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _write_cache_entry(path: Path, source: BinaryIO) -> None:
+    # Write-then-rename so concurrent tweets never read a partial entry.
+    _ensure_dir(path.parent)
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            shutil.copyfileobj(source, handle, _COPY_CHUNK_SIZE)
+        os.replace(temp_name, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(temp_name)
+        raise
+
+
+async def _collect_async_output(output: Any) -> Any:
+    # Models with iterator outputs come back from ``async_run`` as async
+    # generators; gather them so the sync coercion helpers can consume them.
+    # File outputs are async byte streams too, but must stay file-like so the
+    # image persistence code can save them.
+    if hasattr(output, "__aiter__") and not hasattr(output, "read"):
+        return [item async for item in output]
+    return output
+
+
+@lru_cache(maxsize=1)
+def _replicate_client() -> replicate.Client:
+    # Built on first use so ``load_dotenv`` in ``main`` has already run.
+    import replicate
+
+    if _env_flag(USE_CACHE_ENV):
+        return replicate.Client(headers={"X-use-cache": "true"})
+    return replicate.default_client
+
+
+def _build_model_input(payload: dict[str, Any]) -> dict[str, Any]:
+    input_payload = _payload_without_type(payload)
+    if _env_flag(USE_CACHE_ENV):
+        # A template can still opt out with ``"use_cache": false``.
+        input_payload.setdefault("use_cache", True)
+    return input_payload
+
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").strip().lower() in {"1", "true", "yes", "on"}
+
 
 def _payload_without_type(payload: dict[str, Any]) -> dict[str, Any]:
-    return {key: value for key, value in payload.items() if key != "type"}
+    input_payload = payload.copy()
+    input_payload.pop("type", None)
+    return input_payload
 
 
 def _coerce_text_output(output: Any) -> str:
-    if output is None:
-        return ""
+    # Streamed models usually yield a list of ``str`` tokens, so exact types
+    # are resolved with one dict lookup before the generic checks below.
+    coerce = _TEXT_OUTPUT_COERCERS.get(type(output))
+    if coerce is not None:
+        return coerce(output)
     if isinstance(output, str):
         return output
     if isinstance(output, Iterable) and not isinstance(output, (dict, bytes)):
-        parts = []
-        for item in output:
-            if isinstance(item, (str, bytes)):
-                parts.append(item.decode("utf-8") if isinstance(item, bytes) else item)
-        return "".join(parts)
+        return _join_text_parts(output)
     if isinstance(output, dict):
         maybe_output = output.get("output") if "output" in output else None
         if isinstance(maybe_output, str):
@@ -275,52 +675,92 @@ def _coerce_text_output(output: Any) -> str:
     return str(output)
 
 
-def _persist_image_output(
-    output: Any, *, output_dir: Path, prefix: str, default_suffix: str
-) -> Path:
-    output_dir.mkdir(parents=True, exist_ok=True)
+def _join_text_sequence(output: list[Any] | tuple[Any, ...]) -> str:
+    try:
+        return "".join(output)
+    except TypeError:
+        return _join_text_parts(output)
 
-    if isinstance(output, list):
-        for idx, item in enumerate(output, start=1):
-            try:
-                return _persist_image_output(
-                    item,
-                    output_dir=output_dir,
-                    prefix=f"{prefix}_{idx}",
-                    default_suffix=default_suffix,
-                )
-            except PromptTemplateError:
-                continue
-        raise RuntimeError("Unable to persist image output from list response.")
 
-    if hasattr(output, "read") and callable(output.read):
-        return _save_file_like(output, output_dir, prefix, default_suffix)
+def _join_text_parts(output: Iterable[Any]) -> str:
+    parts = []
+    for item in output:
+        if isinstance(item, (str, bytes)):
+            parts.append(item.decode("utf-8") if isinstance(item, bytes) else item)
+    return "".join(parts)
 
-    if isinstance(output, dict):
-        for value in output.values():
-            try:
-                return _persist_image_output(
-                    value,
-                    output_dir=output_dir,
-                    prefix=prefix,
-                    default_suffix=default_suffix,
-                )
-            except RuntimeError:
-                continue
-        raise RuntimeError("Unable to persist image output from dictionary response.")
 
-    if isinstance(output, str):
-        if _looks_like_url(output):
-            return _download_image(output, output_dir, prefix, default_suffix)
+_TEXT_OUTPUT_COERCERS: dict[type, Callable[[Any], str]] = {
+    str: lambda output: output,
+    bytes: lambda output: output.decode("utf-8"),
+    type(None): lambda output: "",
+    list: _join_text_sequence,
+    tuple: _join_text_sequence,
+}
+
+
+def _persist_image_output(
+    output: Any,
+    *,
+    output_dir: Path,
+    prefix: str,
+    default_suffix: str,
+    timestamp: str | None = None,
+) -> Path:
+    path = _try_persist(
+        output,
+        output_dir=output_dir,
+        prefix=prefix,
+        default_suffix=default_suffix,
+        timestamp=timestamp,
+    )
+    if path is None:
         raise RuntimeError(
-            "Image model returned a string that is not a URL; cannot persist."
+            f"Unable to persist image output of type {type(output).__name__}: "
+            "expected a file-like object or an image URL."
         )
+    return path
 
-    raise RuntimeError(f"Unsupported image output type: {type(output)!r}")
+
+def _try_persist(
+    output: Any,
+    *,
+    output_dir: Path,
+    prefix: str,
+    default_suffix: str,
+    timestamp: str | None,
+) -> Path | None:
+    # Depth-first over nested lists and dicts; the first file-like object or
+    # URL found is saved. Anything else is skipped rather than raised, so only
+    # genuine I/O failures surface as exceptions.
+    pending: list[tuple[Any, str]] = [(output, prefix)]
+    while pending:
+        item, item_prefix = pending.pop()
+        if isinstance(item, list):
+            pending.extend(
+                (child, f"{item_prefix}_{idx}")
+                for idx, child in reversed(list(enumerate(item, start=1)))
+            )
+        elif hasattr(item, "read") and callable(item.read):
+            return _save_file_like(
+                item, output_dir, item_prefix, default_suffix, timestamp=timestamp
+            )
+        elif isinstance(item, dict):
+            pending.extend((child, item_prefix) for child in reversed(item.values()))
+        elif isinstance(item, str) and _looks_like_url(item):
+            return _download_image(
+                item, output_dir, item_prefix, default_suffix, timestamp=timestamp
+            )
+    return None
 
 
 def _save_file_like(
-    file_obj: Any, output_dir: Path, prefix: str, default_suffix: str
+    file_obj: Any,
+    output_dir: Path,
+    prefix: str,
+    default_suffix: str,
+    *,
+    timestamp: str | None = None,
 ) -> Path:
     suffix = ""
     name = getattr(file_obj, "name", None)
@@ -329,28 +769,102 @@ def _save_file_like(
     if not suffix:
         suffix = default_suffix
 
-    path = _next_output_path(output_dir, prefix=prefix, suffix=suffix)
-    with path.open("wb") as handle:
-        handle.write(file_obj.read())
+    with _open_new_output(
+        output_dir, prefix=prefix, suffix=suffix, timestamp=timestamp
+    ) as (path, handle):
+        _copy_stream(file_obj, handle)
     return path
 
 
-def _download_image(url: str, output_dir: Path, prefix: str, default_suffix: str) -> Path:
-    suffix = Path(urlparse(url).path).suffix or default_suffix
-    path = _next_output_path(output_dir, prefix=prefix, suffix=suffix)
+@lru_cache(maxsize=1)
+def _http_client() -> httpx.Client:
+    # One pooled client keeps TLS connections to the CDN alive across a batch;
+    # HTTP/2 multiplexing is used when the optional ``h2`` package is present.
+    import httpx
 
-    with urlopen(url) as response:  # nosec - trusted output from Replicate models
-        data = response.read()
-    path.write_bytes(data)
+    client = httpx.Client(
+        http2=importlib.util.find_spec("h2") is not None,
+        timeout=60.0,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=32),
+    )
+    atexit.register(client.close)
+    return client
+
+
+def _download_image(
+    url: str,
+    output_dir: Path,
+    prefix: str,
+    default_suffix: str,
+    *,
+    timestamp: str | None = None,
+) -> Path:
+    suffix = Path(urlparse(url).path).suffix or default_suffix
+    with _open_new_output(
+        output_dir, prefix=prefix, suffix=suffix, timestamp=timestamp
+    ) as (path, handle):
+        # nosec - trusted output from Replicate models
+        with _http_client().stream("GET", url) as response:
+            response.raise_for_status()
+            for chunk in response.iter_bytes(_COPY_CHUNK_SIZE):
+                handle.write(chunk)
     return path
 
 
-def _next_output_path(output_dir: Path, *, prefix: str, suffix: str) -> Path:
-    timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
-    for counter in range(_MAX_OUTPUT_HISTORY):
+def _copy_stream(source: Any, handle: BinaryIO) -> None:
+    # Copy in bounded chunks so peak memory does not scale with image size.
+    if isinstance(source, io.IOBase):
+        shutil.copyfileobj(source, handle, _COPY_CHUNK_SIZE)
+    elif isinstance(source, Iterable):
+        # Replicate ``FileOutput`` objects stream their bytes when iterated but
+        # only offer an unsized ``read()``.
+        for chunk in source:
+            handle.write(chunk)
+    else:
+        handle.write(source.read())
+
+
+@contextlib.contextmanager
+def _open_new_output(
+    output_dir: Path, *, prefix: str, suffix: str, timestamp: str | None = None
+) -> Iterator[tuple[Path, BinaryIO]]:
+    """Reserve a fresh output name and write through the descriptor that created it.
+
+    The file is removed again if the body raises, so failed writes leave no
+    truncated outputs behind.
+    """
+
+    path, fd = _reserve_output_path(
+        output_dir, prefix=prefix, suffix=suffix, timestamp=timestamp
+    )
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            yield path, handle
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+
+
+def _reserve_output_path(
+    output_dir: Path, *, prefix: str, suffix: str, timestamp: str | None
+) -> tuple[Path, int]:
+    if timestamp is None:
+        timestamp = datetime.utcnow().strftime(_FILE_TIMESTAMP_FORMAT)
+    key = (output_dir, prefix, timestamp, suffix)
+    start = _output_counters.get(key, 0)
+    for counter in range(start, _MAX_OUTPUT_HISTORY):
         candidate = output_dir / f"{prefix}_{timestamp}_{counter:04d}{suffix}"
-        if not candidate.exists():
-            return candidate
+        # ``O_EXCL`` creation atomically reserves the name, so concurrent
+        # writers never share a path and a collision costs one syscall.
+        try:
+            fd = os.open(candidate, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            continue
+        if len(_output_counters) >= _MAX_OUTPUT_COUNTERS:
+            _output_counters.clear()
+        _output_counters[key] = counter + 1
+        return candidate, fd
     raise RuntimeError(
         f"Unable to determine unique filename after {_MAX_OUTPUT_HISTORY} attempts."
     )
@@ -367,8 +881,11 @@ def _open_binary_file(path_like: Any):
 
 
 def _looks_like_url(value: str) -> bool:
-    parsed = urlparse(value)
-    return parsed.scheme in {"http", "https"} and bool(parsed.netloc)
+    # Most candidates fail the prefix test, which avoids building a ParseResult.
+    # Schemes are case-insensitive, and the longest prefix is 8 characters.
+    if not value[:8].lower().startswith(_URL_PREFIXES):
+        return False
+    return bool(urlparse(value).netloc)
 
 
 def _append_tweet_index(
@@ -377,9 +894,13 @@ def _append_tweet_index(
     tweet: str,
     json_path: Path,
     image_path: Path,
+    timestamp: str | None = None,
 ) -> None:
+    """Queue an entry for ``tweets.txt``; call ``_flush_tweet_index`` to write it."""
+
     index_path = output_dir / "tweets.txt"
-    timestamp = datetime.utcnow().isoformat(timespec="seconds")
+    if timestamp is None:
+        timestamp = datetime.utcnow().isoformat(timespec="seconds")
     entry_lines = [
         f"[{timestamp}]",
         tweet.strip(),
@@ -387,9 +908,29 @@ def _append_tweet_index(
         f"Image: {image_path.name}",
         "",
     ]
-    index_path.parent.mkdir(parents=True, exist_ok=True)
-    with index_path.open("a", encoding="utf-8") as handle:
-        handle.write("\n".join(entry_lines))
+    entry = "\n".join(entry_lines).encode("utf-8")
+    _index_buffer.setdefault(index_path, []).append(entry)
+
+
+def _flush_tweet_index() -> None:
+    """Append every queued index entry with one locked write per file."""
+
+    while _index_buffer:
+        index_path, entries = _index_buffer.popitem()
+        with index_path.open("ab") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                handle.write(b"".join(entries))
+                handle.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+atexit.register(_flush_tweet_index)
+
+
 if __name__ == "__main__":
     sys.exit(main())
 